@@ -8,16 +8,22 @@ JSON 데이터셋에서 게임을 DB로 적재하는 management command
 Game 테이블에 데이터를 추가합니다.
 """
 
-import json
-import os
+import orjson
+from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import transaction
 from games.models import Game
 
+JSON_PATH = Path(settings.BASE_DIR) / 'users' / 'steam_sale_dataset_fast.json'
+FALLBACK_JSON_PATH = Path(settings.BASE_DIR) / 'steam_sale_dataset_fast.json'
+
 
 class Command(BaseCommand):
     help = 'Load games from steam_sale_dataset_fast.json into the database'
 
+    BATCH_SIZE = 500
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--limit',
@@ -36,20 +42,20 @@ class Command(BaseCommand):
         update_existing = options.get('update', False)
         
         # 1. JSON 파일 경로 설정
-        json_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_dataset_fast.json')
+        json_path = JSON_PATH
         
-        if not os.path.exists(json_path):
-            json_path = os.path.join(settings.BASE_DIR, 'steam_sale_dataset_fast.json')
+        if not json_path.exists():
+            json_path = FALLBACK_JSON_PATH
         
-        if not os.path.exists(json_path):
+        if not json_path.exists():
             self.stdout.write(self.style.ERROR(f'JSON file not found at {json_path}'))
             return
 
         self.stdout.write(f"📂 Loading data from: {json_path}")
 
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(json_path, 'rb') as f:
+                data = orjson.loads(f.read())
             
             total = len(data)
             if limit:
@@ -58,11 +64,12 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f"📊 Processing all {total} games...")
 
-            created_count = 0
-            updated_count = 0
             skipped_count = 0
             
-            for i, item in enumerate(data):
+            # 1차 패스: 유효한 행만 steam_app_id 기준으로 모으기
+            # (중복은 기존 동작과 같게 --update면 마지막 항목, 아니면 첫 항목 유지)
+            rows = {}
+            for item in data:
                 steam_id = item.get('steam_app_id')
                 if not steam_id:
                     skipped_count += 1
@@ -74,41 +81,58 @@ class Command(BaseCommand):
                     skipped_count += 1
                     continue
                 
+                if steam_id_int in rows and not update_existing:
+                    continue
+                
                 # 게임 데이터 준비
-                game_data = {
+                rows[steam_id_int] = {
                     'title': item.get('title', f'Game {steam_id}'),
                     'image_url': item.get('thumbnail', ''),
                     'genre': 'Unknown',  # 나중에 RAWG에서 업데이트
                 }
+            
+            # 이미 DB에 있는 게임 조회 (Steam App ID를 rawg_id로 저장한 행 기준, 온보딩과 동일)
+            steam_ids = list(rows)
+            by_rawg_id = dict(
+                Game.objects.filter(rawg_id__in=steam_ids).values_list('rawg_id', 'id')
+            )
+            # steam_appid는 unique이므로 다른 행이 이미 쓰고 있는지도 확인
+            by_steam_appid = dict(
+                Game.objects.filter(steam_appid__in=steam_ids).values_list('steam_appid', 'id')
+            )
+            
+            to_create = []
+            to_update = []
+            for steam_id_int, game_data in rows.items():
+                game_id = by_rawg_id.get(steam_id_int)
+                owner_id = by_steam_appid.get(steam_id_int)
                 
-                # Steam App ID를 rawg_id 필드에 저장 (고유 식별자로 사용)
-                try:
-                    game, created = Game.objects.get_or_create(
-                        rawg_id=steam_id_int,
-                        defaults={
-                            **game_data,
-                            'steam_appid': steam_id_int,  # Steam App ID도 저장
-                        }
-                    )
-                    
-                    if created:
-                        created_count += 1
-                    elif update_existing:
-                        # 기존 게임 업데이트
-                        for key, value in game_data.items():
-                            setattr(game, key, value)
-                        game.steam_appid = steam_id_int
-                        game.save()
-                        updated_count += 1
-                    
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f"Error with {item.get('title')}: {e}"))
+                # 이미 있고 --update가 아니면 아무것도 쓰지 않음
+                if game_id is not None and not update_existing:
+                    continue
+                
+                if owner_id is not None and owner_id != game_id:
+                    # 다른 게임이 같은 steam_appid를 사용 중 -> 저장하면 unique 제약 위반
+                    self.stdout.write(self.style.WARNING(
+                        f"Error with {game_data['title']}: steam_appid {steam_id_int} already used by game {owner_id}"
+                    ))
                     skipped_count += 1
                     continue
                 
-                # 진행 상황 표시
-                if (i + 1) % 100 == 0:
-                    self.stdout.write(f"⏳ Processed {i + 1}/{len(data)} games...")
+                if game_id is not None:
+                    to_update.append(Game(id=game_id, steam_appid=steam_id_int, **game_data))
+                else:
+                    # Steam App ID를 rawg_id 필드에 저장 (고유 식별자로 사용)
+                    to_create.append(Game(rawg_id=steam_id_int, steam_appid=steam_id_int, **game_data))
+            
+            # 행마다 쿼리하는 대신 배치 단위로 INSERT / UPDATE
+            with transaction.atomic():
+                Game.objects.bulk_create(to_create, batch_size=self.BATCH_SIZE)
+                Game.objects.bulk_update(
+                    to_update, ['title', 'image_url', 'genre', 'steam_appid'], batch_size=self.BATCH_SIZE
+                )
+            created_count = len(to_create)
+            updated_count = len(to_update)
 
             self.stdout.write("")
             self.stdout.write(self.style.SUCCESS(f"✅ Import completed!"))
@@ -118,7 +142,7 @@ class Command(BaseCommand):
             self.stdout.write(f"   ⏭️  Skipped: {skipped_count} games")
             self.stdout.write(f"   📊 Total in DB: {Game.objects.count()} games")
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             self.stdout.write(self.style.ERROR(f'Invalid JSON file: {e}'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error occurred: {str(e)}'))
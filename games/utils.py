@@ -2,6 +2,7 @@ import os
 import requests
 import logging
 from django.conf import settings
+from django.db import transaction
 from .models import Game, GameScreenshot, GameTrailer
 
 # Configure logging
@@ -196,41 +197,42 @@ def update_game_with_rawg(game, force_refresh=False):
         logger.warning(f"Could not fetch details for RAWG game {rawg_id}")
         return False
 
-    # Fetch and save screenshots (avoid duplicates)
+    # Fetch screenshots and trailers first so no transaction is held across network calls
     screenshots = fetch_rawg_screenshots(rawg_id, limit=10)
-    screenshot_count = 0
-    for ss in screenshots:
-        _, created = GameScreenshot.objects.get_or_create(
-            game=game,
-            image_url=ss['image']
-        )
-        if created:
-            screenshot_count += 1
-    
-    if screenshot_count > 0:
-        logger.info(f"Added {screenshot_count} new screenshots for '{game.title}'")
-
-    # Fetch and save trailers (avoid duplicates)
     trailers = fetch_rawg_trailers(rawg_id)
+
+    # Save screenshots and trailers in a single transaction (avoid duplicates)
+    screenshot_count = 0
     trailer_count = 0
-    for tr in trailers:
-        # Check if trailer data has required fields
-        if 'data' not in tr or '480' not in tr['data'] or 'max' not in tr['data']:
-            logger.warning(f"Skipping trailer '{tr.get('name', 'Unknown')}' - missing video data")
-            continue
+    with transaction.atomic():
+        for ss in screenshots:
+            _, created = GameScreenshot.objects.get_or_create(
+                game=game,
+                image_url=ss['image']
+            )
+            if created:
+                screenshot_count += 1
+
+        for tr in trailers:
+            # Check if trailer data has required fields
+            if 'data' not in tr or '480' not in tr['data'] or 'max' not in tr['data']:
+                logger.warning(f"Skipping trailer '{tr.get('name', 'Unknown')}' - missing video data")
+                continue
             
-        _, created = GameTrailer.objects.get_or_create(
-            game=game,
-            name=tr['name'],
-            defaults={
-                'preview_url': tr.get('preview', ''),
-                'data_480': tr['data']['480'],
-                'data_max': tr['data']['max']
-            }
-        )
-        if created:
-            trailer_count += 1
+            _, created = GameTrailer.objects.get_or_create(
+                game=game,
+                name=tr['name'],
+                defaults={
+                    'preview_url': tr.get('preview', ''),
+                    'data_480': tr['data']['480'],
+                    'data_max': tr['data']['max']
+                }
+            )
+            if created:
+                trailer_count += 1
     
+    if screenshot_count > 0:
+        logger.info(f"Added {screenshot_count} new screenshots for '{game.title}'")
     if trailer_count > 0:
         logger.info(f"Added {trailer_count} new trailers for '{game.title}'")
 
@@ -11,15 +11,12 @@ django.setup()
 
 from games.models import Game
 
+APP_ID_RE = re.compile(r'\d+')
+
 def extract_app_id(game_id_str):
     """Extract numeric app ID from Steam game_id"""
-    match = re.search(r'\d+', str(game_id_str))
-    if match:
-        return int(match.group())
-    try:
-        return int(game_id_str)
-    except:
-        return None
+    match = APP_ID_RE.search(str(game_id_str))
+    return int(match.group()) if match else None
 
 # Load JSON
 json_path = r'c:\Users\jam67\Desktop\ssafy\관통프로젝트\ChuraiGame\users\steam_sale_dataset_fast.json'
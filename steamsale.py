@@ -13,10 +13,16 @@ Usage:
     python steamsale.py
 """
 
+import os
+import stat
+import tempfile
 import requests
-import json
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from datetime import datetime
+from operator import itemgetter
 
 # ==========================================
 # 설정
@@ -32,6 +38,19 @@ DEALS_API_URL = "https://www.cheapshark.com/api/1.0/deals"
 GAMES_API_URL = "https://www.cheapshark.com/api/1.0/games"
 
 
+def create_session():
+    """
+    keep-alive 연결을 재사용하는 Session 생성 (일시적 오류는 자동 재시도)
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+    return session
+
+
+SESSION = create_session()
+
+
 def fetch_deals(page_number=0, sort_by="Deal Rating"):
     """
     CheapShark Deals API로 세일 게임 목록 조회
@@ -53,9 +72,9 @@ def fetch_deals(page_number=0, sort_by="Deal Rating"):
     }
     
     try:
-        response = requests.get(DEALS_API_URL, params=params, timeout=30)
+        response = SESSION.get(DEALS_API_URL, params=params, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         print(f"❌ API 요청 실패: {e}")
         return []
@@ -72,9 +91,9 @@ def fetch_historical_low(game_id):
         dict: cheapestPriceEver 정보 또는 None
     """
     try:
-        response = requests.get(f"{GAMES_API_URL}?id={game_id}", timeout=10)
+        response = SESSION.get(GAMES_API_URL, params={"id": game_id}, timeout=10)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get('cheapestPriceEver', None)
     except Exception:
         pass
@@ -102,6 +121,10 @@ def crawl_steam_sales():
         
         filtered_count = 0
         for deal in deals:
+            # 목표 개수에 도달하면 남은 항목은 파싱하지 않음
+            if len(collected_data) >= TARGET_COUNT:
+                break
+            
             # 리뷰 개수 필터링 (핵심! 스캠 게임 차단)
             review_count = int(deal.get('steamRatingCount') or 0)
             if review_count < MIN_REVIEW_COUNT:
@@ -153,6 +176,9 @@ def crawl_steam_sales():
         
         print(f"   ✅ 페이지 {page + 1} 완료 (수집: {len(collected_data)}개, 필터링됨: {filtered_count}개)")
         
+        if len(collected_data) >= TARGET_COUNT:
+            break
+        
         page += 1
         time.sleep(0.3)  # API 예의
         
@@ -161,9 +187,6 @@ def crawl_steam_sales():
             print("⚠️ 최대 페이지 도달")
             break
     
-    # 목표 개수에 맞춰 자르기
-    collected_data = collected_data[:TARGET_COUNT]
-    
     # 역대 최저가 정보 조회 (선택적)
     if FETCH_HISTORICAL_LOW and len(collected_data) > 0:
         print(f"\n📊 역대 최저가 정보 조회 중... (상위 100개)")
@@ -172,15 +195,16 @@ def crawl_steam_sales():
             if cheapshark_id:
                 historical = fetch_historical_low(cheapshark_id)
                 if historical:
-                    game['cheapest_price_ever'] = float(historical.get('price', 0))
-                    game['cheapest_price_ever_krw'] = int(float(historical.get('price', 0)) * 1300)
+                    # 가격 문자열은 한 번만 변환해서 재사용
+                    lowest_price = float(historical.get('price', 0))
+                    game['cheapest_price_ever'] = lowest_price
+                    game['cheapest_price_ever_krw'] = int(lowest_price * 1300)
                     game['cheapest_date'] = historical.get('date', '')
                     
-                    # 현재 가격이 역대 최저가인지 확인
-                    if game['current_price_usd'] <= float(historical.get('price', 999)):
-                        game['is_historical_low'] = True
-                    else:
-                        game['is_historical_low'] = False
+                    # 현재 가격이 역대 최저가인지 확인 (가격 정보가 없으면 최저가로 간주)
+                    game['is_historical_low'] = (
+                        'price' not in historical or game['current_price_usd'] <= lowest_price
+                    )
             
             if (i + 1) % 10 == 0:
                 print(f"   ✅ {i + 1}/100 완료")
@@ -196,23 +220,20 @@ def categorize_data(collected_data):
     # 1. 현재 세일 중 (전체 목록)
     current_sales = sorted(
         collected_data, 
-        key=lambda x: x.get('discount_rate', 0), 
+        key=itemgetter('discount_rate'), 
         reverse=True
     )
     
     # 2. 인기 게임 세일 (리뷰 많은 순)
     popular_sales = sorted(
         [g for g in collected_data if g.get('discount_rate', 0) >= 0.3],
-        key=lambda x: x.get('review_count', 0),
+        key=itemgetter('review_count'),
         reverse=True
     )[:50]
     
     # 3. 역대 최대 할인 (할인율 높은 순, 평가 좋은 것만)
-    top_discounts = sorted(
-        [g for g in collected_data if g.get('steam_rating', 0) >= 85],
-        key=lambda x: x.get('discount_rate', 0),
-        reverse=True
-    )[:50]
+    # current_sales가 이미 할인율 순이므로 다시 정렬하지 않고 걸러내기만 함
+    top_discounts = [g for g in current_sales if g.get('steam_rating', 0) >= 85][:50]
     
     # 4. 역대 최저가 게임
     historical_lows = [
@@ -223,7 +244,7 @@ def categorize_data(collected_data):
     # 5. 높은 평가 게임
     highly_rated = sorted(
         [g for g in collected_data if g.get('steam_rating', 0) >= 90],
-        key=lambda x: (x.get('steam_rating', 0), x.get('review_count', 0)),
+        key=itemgetter('steam_rating', 'review_count'),
         reverse=True
     )[:50]
     
@@ -236,6 +257,30 @@ def categorize_data(collected_data):
     }
 
 
+def write_atomic(path, data):
+    """
+    임시 파일에 쓴 뒤 교체하여, 읽는 쪽에서 잘린 파일을 보지 않도록 저장
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        
+        # mkstemp는 0600으로 만들므로 기존 파일 권한(새 파일이면 umask 기준)으로 맞춤
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
 def save_data(categorized_data, collected_data):
     """
     데이터를 JSON 파일로 저장
@@ -259,13 +304,11 @@ def save_data(categorized_data, collected_data):
     }
     
     structured_path = 'users/steam_sale_data.json'
-    with open(structured_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    write_atomic(structured_path, orjson.dumps(result, option=orjson.OPT_INDENT_2))
     
     # 레거시 형식 저장 (하위 호환성)
     legacy_path = 'users/steam_sale_dataset_fast.json'
-    with open(legacy_path, 'w', encoding='utf-8') as f:
-        json.dump(collected_data, f, ensure_ascii=False, indent=2)
+    write_atomic(legacy_path, orjson.dumps(collected_data, option=orjson.OPT_INDENT_2))
     
     return structured_path, legacy_path
 
@@ -15,14 +15,24 @@ Usage:
     python manage.py update_steam_sales --min-reviews 1000
 """
 
-import requests
-import json
-import time
 import os
+import stat
+import tempfile
+import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from datetime import datetime
+from operator import itemgetter
+from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 
+STRUCTURED_PATH = Path(settings.BASE_DIR) / 'users' / 'steam_sale_data.json'
+LEGACY_PATH = Path(settings.BASE_DIR) / 'users' / 'steam_sale_dataset_fast.json'
+
 
 class Command(BaseCommand):
     help = 'Fetch and update Steam sale data using CheapShark API (high-quality games only)'
@@ -31,6 +41,8 @@ class Command(BaseCommand):
     DEALS_API_URL = "https://www.cheapshark.com/api/1.0/deals"
     GAMES_API_URL = "https://www.cheapshark.com/api/1.0/games"
     PAGE_SIZE = 60  # CheapShark 최대값
+    MAX_PAGE = 50  # 무한 루프 방지
+    MAX_WORKERS = 5  # 동시 요청 수 (API 예의)
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -63,8 +75,19 @@ class Command(BaseCommand):
             help='Skip fetching historical low prices'
         )
 
+    def _create_session(self):
+        """keep-alive 연결을 재사용하는 Session (일시적 오류는 자동 재시도)"""
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_WORKERS, max_retries=retry)
+        session.mount("https://", adapter)
+        return session
+
     def fetch_deals(self, page_number=0, min_rating=75):
-        """CheapShark Deals API로 세일 게임 목록 조회"""
+        """
+        CheapShark Deals API로 세일 게임 목록 조회
+        (게임 목록, X-Total-Page-Count 헤더 값 또는 None) 반환
+        """
         params = {
             "storeID": "1",          # 1 = Steam
             "onSale": "1",           # 현재 세일 중
@@ -75,29 +98,82 @@ class Command(BaseCommand):
         }
         
         try:
-            response = requests.get(self.DEALS_API_URL, params=params, timeout=30)
+            response = self.session.get(self.DEALS_API_URL, params=params, timeout=30)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            total_pages = response.headers.get('X-Total-Page-Count', '')
+            return orjson.loads(response.content), int(total_pages) if total_pages.isdigit() else None
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             self.stdout.write(self.style.ERROR(f"❌ API 요청 실패: {e}"))
-            return []
+            return [], None
 
     def fetch_historical_low(self, game_id):
         """CheapShark Games API로 역대 최저가 정보 조회"""
         try:
-            response = requests.get(f"{self.GAMES_API_URL}?id={game_id}", timeout=10)
+            response = self.session.get(self.GAMES_API_URL, params={"id": game_id}, timeout=10)
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return data.get('cheapestPriceEver', None)
         except Exception:
             pass
         return None
 
+    def _parse_deal(self, deal, min_reviews):
+        """Deals API 항목을 저장용 dict로 변환 (필터링 대상이면 None)"""
+        # 리뷰 개수 필터링 (핵심! 스캠 게임 차단)
+        review_count = int(deal.get('steamRatingCount') or 0)
+        if review_count < min_reviews:
+            return None
+
+        # 스팀 앱 ID가 없는 경우 스킵
+        steam_app_id = deal.get('steamAppID')
+        if not steam_app_id:
+            return None
+
+        # 할인율 계산
+        savings = float(deal.get('savings') or 0)
+        discount_rate = round(savings / 100, 2)
+
+        # 가격 변환 (달러 -> 원화)
+        sale_price_usd = float(deal.get('salePrice') or 0)
+        normal_price_usd = float(deal.get('normalPrice') or 0)
+        sale_price_krw = int(sale_price_usd * 1300)
+        normal_price_krw = int(normal_price_usd * 1300)
+
+        # CheapShark redirect URL 생성 (다른 스토어로 연결 가능)
+        deal_id = deal.get('dealID', '')
+        cheapshark_url = f"https://www.cheapshark.com/redirect?dealID={deal_id}" if deal_id else ""
+
+        game_info = {
+            'game_id': f"app{steam_app_id}",
+            'steam_app_id': steam_app_id,
+            'cheapshark_id': deal.get('gameID'),
+            'deal_id': deal_id,  # CheapShark deal ID
+            'title': deal.get('title'),
+            'current_price': sale_price_krw,
+            'original_price': normal_price_krw,
+            'current_price_usd': sale_price_usd,
+            'original_price_usd': normal_price_usd,
+            'discount_rate': discount_rate,
+            'steam_rating': int(deal.get('steamRatingPercent') or 0),
+            'steam_rating_text': deal.get('steamRatingText', ''),
+            'review_count': review_count,
+            'metacritic_score': int(deal.get('metacriticScore') or 0),
+            'deal_rating': deal.get('dealRating', '0'),
+            'thumbnail': deal.get('thumb'),
+            'store_link': f"https://store.steampowered.com/app/{steam_app_id}/",
+            'cheapshark_url': cheapshark_url,  # 가격 비교 / 다른 스토어 링크
+            'is_on_sale': deal.get('isOnSale') == "1",
+            'sale_count': review_count  # 하위 호환성을 위해 리뷰 수를 sale_count로도 저장
+        }
+        
+        return game_info
+
     def handle(self, *args, **options):
         target_count = options['count']
         min_rating = options['min_rating']
         min_reviews = options['min_reviews']
         fetch_history = not options['no_history']
+        self.session = self._create_session()
         
         self.stdout.write(self.style.NOTICE(
             f"🚀 CheapShark API로 Steam 세일 데이터 업데이트 시작"
@@ -107,101 +183,68 @@ class Command(BaseCommand):
         self.stdout.write("")
         
         collected_data = []
-        page = 0
         
         # 데이터 수집
-        while len(collected_data) < target_count:
-            deals = self.fetch_deals(page_number=page, min_rating=min_rating)
-            
-            if not deals:
-                self.stdout.write(self.style.WARNING("🏁 더 이상 데이터가 없습니다."))
-                break
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            # 첫 페이지 응답의 전체 페이지 수로 나머지 페이지를 한 번에 요청 (동시 요청 수는 MAX_WORKERS로 제한)
+            first_deals, total_pages = self.fetch_deals(page_number=0, min_rating=min_rating)
+            # 헤더가 없으면 MAX_PAGE까지, 있으면 한 페이지 여유를 두고 요청 (빈 페이지는 아래에서 종료 처리)
+            last_page = self.MAX_PAGE if total_pages is None else min(self.MAX_PAGE, total_pages)
+            rest = executor.map(
+                lambda p: self.fetch_deals(page_number=p, min_rating=min_rating)[0],
+                range(1, last_page + 1)
+            )
             
-            filtered_count = 0
-            for deal in deals:
-                # 리뷰 개수 필터링 (핵심! 스캠 게임 차단)
-                review_count = int(deal.get('steamRatingCount') or 0)
-                if review_count < min_reviews:
-                    filtered_count += 1
-                    continue
-                
-                # 스팀 앱 ID가 없는 경우 스킵
-                steam_app_id = deal.get('steamAppID')
-                if not steam_app_id:
-                    continue
+            for page, deals in enumerate(chain([first_deals], rest)):
+                if not deals:
+                    self.stdout.write(self.style.WARNING("🏁 더 이상 데이터가 없습니다."))
+                    break
                 
-                # 할인율 계산
-                savings = float(deal.get('savings') or 0)
-                discount_rate = round(savings / 100, 2)
+                for deal in deals:
+                    game_info = self._parse_deal(deal, min_reviews)
+                    if game_info:
+                        collected_data.append(game_info)
                 
-                # 가격 변환 (달러 -> 원화)
-                sale_price_usd = float(deal.get('salePrice') or 0)
-                normal_price_usd = float(deal.get('normalPrice') or 0)
-                sale_price_krw = int(sale_price_usd * 1300)
-                normal_price_krw = int(normal_price_usd * 1300)
+                if page % 3 == 0:
+                    self.stdout.write(f"   ✅ 페이지 {page + 1} 완료 (수집: {len(collected_data)}개)")
                 
-                # CheapShark redirect URL 생성 (다른 스토어로 연결 가능)
-                deal_id = deal.get('dealID', '')
-                cheapshark_url = f"https://www.cheapshark.com/redirect?dealID={deal_id}" if deal_id else ""
-                
-                game_info = {
-                    'game_id': f"app{steam_app_id}",
-                    'steam_app_id': steam_app_id,
-                    'cheapshark_id': deal.get('gameID'),
-                    'deal_id': deal_id,  # CheapShark deal ID
-                    'title': deal.get('title'),
-                    'current_price': sale_price_krw,
-                    'original_price': normal_price_krw,
-                    'current_price_usd': sale_price_usd,
-                    'original_price_usd': normal_price_usd,
-                    'discount_rate': discount_rate,
-                    'steam_rating': int(deal.get('steamRatingPercent') or 0),
-                    'steam_rating_text': deal.get('steamRatingText', ''),
-                    'review_count': review_count,
-                    'metacritic_score': int(deal.get('metacriticScore') or 0),
-                    'deal_rating': deal.get('dealRating', '0'),
-                    'thumbnail': deal.get('thumb'),
-                    'store_link': f"https://store.steampowered.com/app/{steam_app_id}/",
-                    'cheapshark_url': cheapshark_url,  # 가격 비교 / 다른 스토어 링크
-                    'is_on_sale': deal.get('isOnSale') == "1",
-                    'sale_count': review_count  # 하위 호환성을 위해 리뷰 수를 sale_count로도 저장
-                }
-                
-                collected_data.append(game_info)
-            
-            if page % 3 == 0:
-                self.stdout.write(f"   ✅ 페이지 {page + 1} 완료 (수집: {len(collected_data)}개)")
-            
-            page += 1
-            time.sleep(0.3)
+                if len(collected_data) >= target_count:
+                    break
+            else:
+                if last_page == self.MAX_PAGE:
+                    self.stdout.write(self.style.WARNING("⚠️ 최대 페이지 도달"))
+                else:
+                    self.stdout.write(self.style.WARNING("🏁 더 이상 데이터가 없습니다."))
             
-            if page > 50:
-                self.stdout.write(self.style.WARNING("⚠️ 최대 페이지 도달"))
-                break
+            # 목표에 도달했으면 아직 시작하지 않은 페이지 요청은 취소
+            executor.shutdown(cancel_futures=True)
         
         # 목표 개수에 맞춰 자르기
         collected_data = collected_data[:target_count]
         
-        # 역대 최저가 정보 조회
+        # 역대 최저가 정보 조회 (동시 요청)
         if fetch_history and len(collected_data) > 0:
             self.stdout.write(f"\n📊 역대 최저가 정보 조회 중... (상위 100개)")
-            for i, game in enumerate(collected_data[:100]):
-                cheapshark_id = game.get('cheapshark_id')
-                if cheapshark_id:
-                    historical = self.fetch_historical_low(cheapshark_id)
+            targets = [g for g in collected_data[:100] if g.get('cheapshark_id')]
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+                results = executor.map(
+                    self.fetch_historical_low, [g['cheapshark_id'] for g in targets]
+                )
+                for i, (game, historical) in enumerate(zip(targets, results)):
                     if historical:
-                        game['cheapest_price_ever'] = float(historical.get('price', 0))
-                        game['cheapest_price_ever_krw'] = int(float(historical.get('price', 0)) * 1300)
+                        # 가격 문자열은 한 번만 변환해서 재사용
+                        lowest_price = float(historical.get('price', 0))
+                        game['cheapest_price_ever'] = lowest_price
+                        game['cheapest_price_ever_krw'] = int(lowest_price * 1300)
                         game['cheapest_date'] = historical.get('date', '')
                         
-                        if game['current_price_usd'] <= float(historical.get('price', 999)):
-                            game['is_historical_low'] = True
-                        else:
-                            game['is_historical_low'] = False
-                
-                if (i + 1) % 20 == 0:
-                    self.stdout.write(f"   ✅ {i + 1}/100 완료")
-                time.sleep(0.2)
+                        # 현재 가격이 역대 최저가인지 확인 (가격 정보가 없으면 최저가로 간주)
+                        game['is_historical_low'] = (
+                            'price' not in historical or game['current_price_usd'] <= lowest_price
+                        )
+                    
+                    if (i + 1) % 20 == 0:
+                        self.stdout.write(f"   ✅ {i + 1}/{len(targets)} 완료")
         
         # 데이터 분류
         categorized = self._categorize_data(collected_data)
@@ -224,16 +267,16 @@ class Command(BaseCommand):
             **categorized
         }
         
-        # 파일 저장
-        structured_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_data.json')
-        legacy_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_dataset_fast.json')
+        # 파일 저장 (디스크의 내용과 같으면 다시 쓰지 않아 main_view 캐시가 유지됨)
+        legacy_payload = orjson.dumps(collected_data, option=orjson.OPT_INDENT_2)
         
         try:
-            with open(structured_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            if self._is_unchanged(result, legacy_payload):
+                self.stdout.write(self.style.SUCCESS("\n✅ 데이터 변경 없음, 파일 저장을 건너뜁니다."))
+                return
             
-            with open(legacy_path, 'w', encoding='utf-8') as f:
-                json.dump(collected_data, f, ensure_ascii=False, indent=2)
+            self._write_atomic(STRUCTURED_PATH, orjson.dumps(result, option=orjson.OPT_INDENT_2))
+            self._write_atomic(LEGACY_PATH, legacy_payload)
             
             self.stdout.write(self.style.SUCCESS("\n🎉 완료!"))
             self.stdout.write(f"   📊 전체 수집: {len(collected_data)}개")
@@ -241,35 +284,67 @@ class Command(BaseCommand):
             self.stdout.write(f"   💰 역대 최대 할인: {len(categorized['top_discounts'])}개")
             self.stdout.write(f"   ⭐ 역대 최저가: {len(categorized.get('historical_lows', []))}개")
             self.stdout.write(f"   🌟 높은 평가: {len(categorized['highly_rated'])}개")
-            self.stdout.write(f"   📁 저장 위치: {structured_path}")
-            self.stdout.write(f"   📁 레거시 파일: {legacy_path}")
+            self.stdout.write(f"   📁 저장 위치: {STRUCTURED_PATH}")
+            self.stdout.write(f"   📁 레거시 파일: {LEGACY_PATH}")
             
         except IOError as e:
             raise CommandError(f"파일 저장 실패: {e}")
 
+    def _is_unchanged(self, result, legacy_payload):
+        """디스크의 두 파일이 이번 결과와 같은지 확인 (updated_at은 매번 바뀌므로 제외)"""
+        try:
+            if LEGACY_PATH.read_bytes() != legacy_payload:
+                return False
+            existing = orjson.loads(STRUCTURED_PATH.read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return False
+        
+        if not isinstance(existing, dict):
+            return False
+        existing.pop('updated_at', None)
+        return existing == {k: v for k, v in result.items() if k != 'updated_at'}
+
+    def _write_atomic(self, path, data):
+        """임시 파일에 쓴 뒤 교체하여, 읽는 쪽에서 잘린 파일을 보지 않도록 저장"""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            
+            # mkstemp는 0600으로 만들므로 기존 파일 권한(새 파일이면 umask 기준)으로 맞춤
+            # (웹 서버가 다른 사용자로 실행돼도 main_view가 읽을 수 있도록)
+            try:
+                mode = stat.S_IMODE(path.stat().st_mode)
+            except FileNotFoundError:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0o666 & ~umask
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
     def _categorize_data(self, collected_data):
         """수집된 데이터를 카테고리별로 분류"""
         
         # 1. 현재 세일 중 (전체)
         current_sales = sorted(
             collected_data,
-            key=lambda x: x.get('discount_rate', 0),
+            key=itemgetter('discount_rate'),
             reverse=True
         )
         
         # 2. 인기 게임 세일 (리뷰 많은 순)
         popular_sales = sorted(
             [g for g in collected_data if g.get('discount_rate', 0) >= 0.3],
-            key=lambda x: x.get('review_count', 0),
+            key=itemgetter('review_count'),
             reverse=True
         )[:50]
         
         # 3. 역대 최대 할인 (평가 좋은 것 중)
-        top_discounts = sorted(
-            [g for g in collected_data if g.get('steam_rating', 0) >= 85],
-            key=lambda x: x.get('discount_rate', 0),
-            reverse=True
-        )[:50]
+        # current_sales가 이미 할인율 순이므로 다시 정렬하지 않고 걸러내기만 함
+        top_discounts = [g for g in current_sales if g.get('steam_rating', 0) >= 85][:50]
         
         # 4. 역대 최저가
         historical_lows = [
@@ -280,7 +355,7 @@ class Command(BaseCommand):
         # 5. 높은 평가 게임
         highly_rated = sorted(
             [g for g in collected_data if g.get('steam_rating', 0) >= 90],
-            key=lambda x: (x.get('steam_rating', 0), x.get('review_count', 0)),
+            key=itemgetter('steam_rating', 'review_count'),
             reverse=True
         )[:50]
         
@@ -111,6 +111,7 @@ def get_onboarding_games(step=0, exclude_rated=None):
     
     # 이미 평가한 게임 제외
     if exclude_rated:
+        exclude_rated = set(exclude_rated)
         games = [g for g in games if g['rawg_id'] not in exclude_rated]
     
     return {
@@ -218,7 +219,7 @@ def get_recommendations_for_user(user, limit=50):
     
     def format_json_games(json_games, base_score=80, rated_ids=None):
         """JSON 게임 데이터를 프론트엔드 형식으로 변환"""
-        rated_ids = rated_ids or []
+        rated_ids = set(rated_ids or ())
         result = []
         for i, game in enumerate(json_games):
             # 이미 평가한 게임 제외
@@ -2,12 +2,14 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.gzip import gzip_page
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
 from django.contrib import messages
 from django.utils import timezone
 import json
 import os
+from pathlib import Path
 from django.conf import settings
 
 from .forms import SignupForm, CustomLoginForm
@@ -24,6 +26,10 @@ from .steam_auth import (
 # 만약 games/models.py에 있다면 'from games.models import Game'으로 변경하세요.
 from games.models import Game
 
+# update_steam_sales가 생성하는 세일 데이터 파일
+SALE_DATA_PATH = Path(settings.BASE_DIR) / 'users' / 'steam_sale_data.json'
+LEGACY_SALE_DATA_PATH = Path(settings.BASE_DIR) / 'users' / 'steam_sale_dataset_fast.json'
+
 # --- 1. 회원가입 (Create) ---
 @require_http_methods(["GET", "POST"])
 def signup_view(request):
@@ -81,32 +87,57 @@ def delete_account_view(request):
         return redirect('users:login')
 
 # --- 6. 메인 페이지 (Main View) ---
+# update_steam_sales가 파일을 다시 쓸 때만 갱신되도록 (경로, mtime) 기준으로 캐싱
+_SALE_PAYLOAD_CACHE = {}
+
+
+def _load_sale_payload():
+    """
+    메인 페이지에 넣을 (games_json, best_prices_json) 문자열 반환
+    두 파일 모두 파싱 후 다시 직렬화: 쓰는 도중의 잘린 파일이 캐시되지 않고,
+    들여쓰기 없는 JSON이 템플릿에 들어감
+    """
+    # Try new format first
+    for path in (SALE_DATA_PATH, LEGACY_SALE_DATA_PATH):
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        print(f"파일을 찾을 수 없습니다: {SALE_DATA_PATH}")
+        return "[]", "[]"
+
+    # key와 payload를 튜플 하나로 저장/조회해야 다른 스레드가 중간 상태를 보지 않음
+    entry = _SALE_PAYLOAD_CACHE.get('entry')
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    if path == SALE_DATA_PATH:
+        with open(path, 'r', encoding='utf-8') as f:
+            sale_data = json.load(f)
+        games_data = sale_data.get('current_sales', [])
+        # Try historical_lows first, fall back to best_prices
+        best_prices = sale_data.get('historical_lows', sale_data.get('best_prices', []))[:30]  # Top 30 best prices
+        payload = (
+            json.dumps(games_data, cls=DjangoJSONEncoder),
+            json.dumps(best_prices, cls=DjangoJSONEncoder),
+        )
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = (json.dumps(json.load(f)), "[]")
+
+    _SALE_PAYLOAD_CACHE['entry'] = (key, payload)
+    return payload
+
+
+# 세일 게임 JSON이 HTML에 통째로 들어가므로 응답을 gzip으로 압축해서 전송
+@gzip_page
 @login_required(login_url='users:login')
 def main_view(request):
     # JSON 파일에서 게임 데이터 가져오기
-    games_data = []
-    best_prices = []
-    
     try:
-        # Try new format first
-        new_json_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_data.json')
-        legacy_json_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_dataset_fast.json')
-        
-        if os.path.exists(new_json_path):
-            with open(new_json_path, 'r', encoding='utf-8') as f:
-                sale_data = json.load(f)
-                games_data = sale_data.get('current_sales', [])
-                # Try historical_lows first, fall back to best_prices
-                best_prices = sale_data.get('historical_lows', sale_data.get('best_prices', []))[:30]  # Top 30 best prices
-        elif os.path.exists(legacy_json_path):
-            with open(legacy_json_path, 'r', encoding='utf-8') as f:
-                games_data = json.load(f)
-        else:
-            print(f"파일을 찾을 수 없습니다: {new_json_path}")
-
-        games_json = json.dumps(games_data, cls=DjangoJSONEncoder)
-        best_prices_json = json.dumps(best_prices, cls=DjangoJSONEncoder)
-
+        games_json, best_prices_json = _load_sale_payload()
     except Exception as e:
         print(f"게임 데이터를 불러오는 중 오류 발생: {e}")
         games_json = "[]"
@@ -114,7 +145,7 @@ def main_view(request):
 
     # Wishlist IDs
     wishlist_ids = list(request.user.wishlist.values_list('steam_appid', flat=True))
-    wishlist_json = json.dumps(wishlist_ids, cls=DjangoJSONEncoder)
+    wishlist_json = json.dumps(wishlist_ids)
 
     return render(request, 'users/index.html', {
         'user': request.user,
@@ -388,9 +419,8 @@ def personalized_recommendations_api(request):
         if steam_library:
             # Get sale games
             try:
-                json_file_path = os.path.join(settings.BASE_DIR, 'users', 'steam_sale_dataset_fast.json')
-                if os.path.exists(json_file_path):
-                    with open(json_file_path, 'r', encoding='utf-8') as f:
+                if LEGACY_SALE_DATA_PATH.exists():
+                    with open(LEGACY_SALE_DATA_PATH, 'r', encoding='utf-8') as f:
                         sale_games = json.load(f)
                 else:
                     sale_games = []